@@ -2,32 +2,51 @@
 
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures
+import contextlib
 import csv
+import hashlib
 import io
+import itertools
 import json
 import logging
 import os
 import threading
-import time
 from datetime import datetime, timedelta, timezone
 from enum import Enum
+from functools import cache, lru_cache
 
 import httpx
 import modal
+import orjson
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
 from fastapi import FastAPI, File, Form, HTTPException, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 
-# Load .env in local dev mode (set by __main__ or manually)
-if os.environ.get("LOCAL_DEV", "").lower() in ("1", "true"):
+
+@cache
+def _load_env() -> None:
+    """Load .env once per process (local dev only; python-dotenv is optional)."""
     try:
         from dotenv import load_dotenv
-        load_dotenv()
     except ImportError:
-        pass
+        return
+    load_dotenv()
+
 
-LOCAL_DEV = os.environ.get("LOCAL_DEV", "").lower() in ("1", "true")
+# Local dev mode: `python app.py`, or LOCAL_DEV=1 set manually
+LOCAL_DEV = __name__ == "__main__" or os.environ.get("LOCAL_DEV", "").lower() in ("1", "true")
+if LOCAL_DEV:
+    _load_env()
+
+# LOCAL_DEV runs enrich_batch in-process; bound how many uploads enrich at once
+# (queued uploads are cancelled at server shutdown, see _lifespan)
+_enrich_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="enrich")
 
 # ---------------------------------------------------------------------------
 # Section 2: Modal App + Image
@@ -37,9 +56,15 @@ image = modal.Image.debian_slim(python_version="3.12").pip_install(
     "fastapi[standard]",
     "supabase",
     "google-genai",
-    "httpx",
+    "httpx[http2]",
     "python-multipart",
     "composio",
+    "pyahocorasick",
+    "orjson",
+    "tenacity",
+    "cachetools",
+    "aiolimiter",
+    "asyncpg",
 )
 
 app = modal.App(name="prmsoe", image=image)
@@ -85,7 +110,38 @@ class JobStatus(str, Enum):
     FAILED = "FAILED"
 
 
-VALID_STRATEGY_TAGS = {t.value for t in StrategyTag}
+VALID_STRATEGY_TAGS = frozenset(t.value for t in StrategyTag)
+VALID_OUTCOMES = frozenset(t.value for t in OutcomeType)
+
+# LinkedIn Connections.csv columns read by /ingest/upload
+CSV_COLUMNS = ("First Name", "Last Name", "Company", "Position", "URL")
+MAX_UPLOAD_CONTACTS = 500
+
+# enrich_batch fan-out: contacts drafting at once (research runs ahead, bounded
+# by its limiter + the youcom_client pool), plus per-provider
+# token-bucket rates (calls per second) that keep us under You.com / Gemini limits
+ENRICH_CONCURRENCY = 16
+YOUCOM_RATE_PER_SEC = 5
+GEMINI_RATE_PER_SEC = 10
+# Finished contacts (enriched or failed) are persisted in batches of this size —
+# one enrich_many RPC for the rows + one record_failures RPC for the failures
+ENRICH_FLUSH_SIZE = 25
+# Outside LOCAL_DEV a job fans out as one enrich_batch container per chunk of up to
+# this many contacts; chunks only split between companies, so each company's research
+# stays in one chunk (a single company larger than this gets a chunk of its own)
+ENRICH_CHUNK_SIZE = 100
+# Max ids per PostgREST in.() filter — keeps GET/PATCH URLs well under proxy limits
+IN_FILTER_BATCH_SIZE = 100
+# Uncached draft prompts are micro-batched: up to DRAFT_BATCH_SIZE per Gemini call,
+# sent as soon as the batch fills or DRAFT_BATCH_WINDOW_SEC after its first prompt
+DRAFT_BATCH_SIZE = 10
+DRAFT_BATCH_WINDOW_SEC = 0.05
+
+# /composio/status + /analytics/dashboard response cache lifetime (seconds)
+STATUS_CACHE_TTL = 10
+ANALYTICS_CACHE_TTL = 10
+
+# You.com responses are cached per (normalized company, week) — see research_cache_key()
 
 # ---------------------------------------------------------------------------
 # Section 4: Pydantic request/response models
@@ -116,7 +172,28 @@ class AutoDetectRequest(BaseModel):
 # Section 5: Helpers
 # ---------------------------------------------------------------------------
 
+# Short-lived per-user response caches for endpoints the frontend polls
+_status_cache: TTLCache = TTLCache(maxsize=10_000, ttl=STATUS_CACHE_TTL)
+_analytics_cache: TTLCache = TTLCache(maxsize=10_000, ttl=ANALYTICS_CACHE_TTL)
+_cache_lock = threading.Lock()
+
+
+def cache_get(cache: TTLCache, user_id: str):
+    with _cache_lock:
+        return cache.get(user_id)
 
+
+def cache_set(cache: TTLCache, user_id: str, value):
+    with _cache_lock:
+        cache[user_id] = value
+
+
+def cache_invalidate(cache: TTLCache, user_id: str):
+    with _cache_lock:
+        cache.pop(user_id, None)
+
+
+@lru_cache(maxsize=1)
 def get_supabase():
     from supabase import create_client
 
@@ -126,14 +203,25 @@ def get_supabase():
     )
 
 
+async def get_async_supabase():
+    from supabase import acreate_client
+
+    return await acreate_client(
+        os.environ["SUPABASE_URL"],
+        os.environ["SUPABASE_SERVICE_KEY"],
+    )
+
+
+@lru_cache(maxsize=1)
 def get_composio():
     from composio import Composio
 
     return Composio(api_key=os.environ["COMPOSIO_API_KEY"])
 
 
+@lru_cache(maxsize=1)
 def get_gmail_auth_config_id():
-    """Fetch Gmail auth_config_id dynamically from Composio."""
+    """Fetch Gmail auth_config_id dynamically from Composio (cached per process)."""
     composio = get_composio()
     configs = composio.auth_configs.list()
     for cfg in configs.items:
@@ -142,40 +230,314 @@ def get_gmail_auth_config_id():
     raise RuntimeError("No Gmail auth config found in Composio. Set one up at platform.composio.dev")
 
 
-def search_youcom(query: str) -> dict:
-    """Call You.com Web Search API and return raw JSON response."""
-    resp = httpx.get(
-        "https://ydc-index.io/v1/search",
-        params={"query": query},
+def youcom_client() -> httpx.AsyncClient:
+    """Pooled HTTP/2 client for You.com — one per enrich_batch run, shared by all its contacts."""
+    return httpx.AsyncClient(
+        base_url="https://ydc-index.io",
         headers={"X-API-Key": os.environ["YOUCOM_API_KEY"]},
+        http2=True,
+        timeout=30,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+    )
+
+
+def postgrest_client() -> httpx.AsyncClient:
+    """Raw PostgREST client (service role) for payloads we serialize ourselves with orjson."""
+    key = os.environ["SUPABASE_SERVICE_KEY"]
+    return httpx.AsyncClient(
+        base_url=f"{os.environ['SUPABASE_URL']}/rest/v1",
+        headers={
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+        },
+        http2=True,
         timeout=30,
     )
+
+
+async def db_pool():
+    """Optional direct asyncpg pool for enrich_many flushes — None unless SUPABASE_DB_URL is set.
+
+    One per enrich_batch run (per event loop); statement cache off for Supavisor's
+    transaction-mode pooler (port 6543).
+    """
+    url = os.environ.get("SUPABASE_DB_URL")
+    if not url:
+        return None
+    import asyncpg
+
+    return await asyncpg.create_pool(url, min_size=1, max_size=4, statement_cache_size=0)
+
+
+def gemini_client():
+    """Gemini client — one per enrich_batch run so every draft reuses its keep-alive pool."""
+    from google import genai
+
+    return genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+
+
+def _is_transient_http_error(e: BaseException) -> bool:
+    """Timeouts / connection drops / 429 / 5xx — worth retrying; other 4xx are not."""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return isinstance(e, httpx.TransportError)
+
+
+def _is_transient_gemini_error(e: BaseException) -> bool:
+    """Malformed JSON output, rate limits, server errors, timeouts / connection drops — not auth/bad-request."""
+    from google.genai import errors
+
+    if isinstance(e, errors.ClientError):
+        return e.code == 429
+    # google-genai's async path lets httpx transport errors through unwrapped
+    return isinstance(e, (json.JSONDecodeError, errors.ServerError, httpx.TransportError))
+
+
+_backoff = wait_exponential_jitter(initial=0.5, max=8)
+
+
+def _wait_retry_after(retry_state) -> float:
+    """Sleep for a 429's Retry-After (seconds, capped at 30) if sent, else exponential backoff with jitter."""
+    response = getattr(retry_state.outcome.exception(), "response", None)
+    retry_after = getattr(response, "headers", {}).get("Retry-After", "")
+    if retry_after.isdigit():
+        return min(float(retry_after), 30)
+    return _backoff(retry_state)
+
+
+@retry(
+    wait=_wait_retry_after,
+    stop=stop_after_attempt(4),
+    retry=retry_if_exception(_is_transient_http_error),
+    reraise=True,
+)
+async def search_youcom(client: httpx.AsyncClient, limiter: AsyncLimiter, query: str) -> dict:
+    """Call You.com Web Search API (via a youcom_client()) and return raw JSON response."""
+    async with limiter:
+        resp = await client.get("/v1/search", params={"query": query})
     resp.raise_for_status()
-    return resp.json()
+    return orjson.loads(resp.content)
+
+
+def slim_youcom_response(data: dict, query: str) -> dict:
+    """Keep only what parse_youcom_response reads (top 3 hits) plus the query, for caching + storage."""
+    return {
+        "query": query,
+        "hits": [
+            {
+                "title": h.get("title", ""),
+                "description": h.get("description", ""),
+                "snippets": h.get("snippets", []),
+                "url": h.get("url", ""),
+            }
+            for h in data.get("hits", [])[:3]
+        ],
+    }
+
+
+def research_cache_key(company: str) -> dict:
+    """research_cache primary key: normalized company name + Monday of the current UTC week."""
+    today = datetime.now(timezone.utc).date()
+    return {
+        "company_norm": company.lower().strip(),
+        "week_bucket": (today - timedelta(days=today.weekday())).isoformat(),
+    }
+
+
+async def search_youcom_cached(
+    sb, client: httpx.AsyncClient | None, limiter: AsyncLimiter, company: str
+) -> dict:
+    """Research a company via search_youcom, reusing this week's cached response if any.
+
+    With no client (see _enrich_batch) only the cache is consulted.
+    """
+    key = research_cache_key(company)
+
+    try:
+        cached = (
+            await sb.table("research_cache")
+            .select("response")
+            .eq("company_norm", key["company_norm"])
+            .eq("week_bucket", key["week_bucket"])
+            .maybe_single()
+            .execute()
+        )
+    except Exception as e:
+        logger.warning("research_cache read failed, searching live: %s", e)
+        cached = None
+    if cached and cached.data:
+        return cached.data["response"]
+
+    if client is None:
+        raise RuntimeError("You.com client unavailable")
+    query = f"{company} recent news problems"
+    data = slim_youcom_response(await search_youcom(client, limiter, query), query)
+    try:
+        await sb.table("research_cache").upsert({**key, "response": data}).execute()
+    except Exception as e:
+        logger.warning("research_cache write failed: %s", e)
+    return data
 
 
 def parse_youcom_response(data: dict) -> dict:
     """Extract structured fields from You.com search results."""
     hits = data.get("hits", [])[:3]
-    snippets: list[str] = []
-    pain_points = ""
-    source_url = ""
-
-    for i, hit in enumerate(hits):
-        for snippet in hit.get("snippets", []):
-            snippets.append(snippet)
-        if i == 0:
-            pain_points = hit.get("description", "")
-            source_url = hit.get("url", "")
+    top = hits[0] if hits else {}
 
     return {
-        "news_summary": " ".join(snippets)[:2000],
-        "pain_points": pain_points[:1000],
-        "source_url": source_url,
+        "news_summary": " ".join(itertools.chain.from_iterable(h.get("snippets", ()) for h in hits))[:2000],
+        "pain_points": top.get("description", "")[:1000],
+        "source_url": top.get("url", ""),
     }
 
 
-def generate_draft(
+@retry(
+    wait=_wait_retry_after,
+    stop=stop_after_attempt(4),
+    retry=retry_if_exception(_is_transient_gemini_error),
+    reraise=True,
+)
+async def _generate_draft_json(client, limiter: AsyncLimiter, prompt: str) -> dict:
+    """One Gemini call, parsed as JSON — retried on malformed output or transient errors."""
+    async with limiter:
+        response = await client.aio.models.generate_content(
+            model="gemini-2.0-flash",
+            contents=prompt,
+            config={
+                "response_mime_type": "application/json",
+            },
+        )
+    return json.loads(response.text)
+
+
+def _is_transient_gemini_api_error(e: BaseException) -> bool:
+    """Rate limits and server errors only — a malformed batch falls back per prompt instead."""
+    return not isinstance(e, json.JSONDecodeError) and _is_transient_gemini_error(e)
+
+
+@retry(
+    wait=_wait_retry_after,
+    stop=stop_after_attempt(4),
+    retry=retry_if_exception(_is_transient_gemini_api_error),
+    reraise=True,
+)
+async def _generate_drafts_json(client, limiter: AsyncLimiter, prompts: list[str]) -> list:
+    """Several draft prompts in one Gemini call → one parsed draft per prompt, in prompt order.
+
+    Drafts are matched to prompts by their required "task" number, never by array
+    position; a missing, duplicate or extra task raises ValueError (as does bad JSON).
+    """
+    combined = (
+        f"Complete each of the {len(prompts)} independent tasks below. Return ONLY a JSON array "
+        f"with exactly {len(prompts)} objects, each shaped as its task instructs plus a \"task\" "
+        "field holding that task's number.\n\n"
+        + "\n\n".join(f"=== TASK {i} ===\n{p}" for i, p in enumerate(prompts, 1))
+    )
+    async with limiter:
+        response = await client.aio.models.generate_content(
+            model="gemini-2.0-flash",
+            contents=combined,
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {
+                            "task": {"type": "INTEGER"},
+                            "draft_message": {"type": "STRING"},
+                            "strategy_tag": {"type": "STRING", "enum": sorted(VALID_STRATEGY_TAGS)},
+                        },
+                        "required": ["task", "draft_message", "strategy_tag"],
+                    },
+                },
+            },
+        )
+    results = json.loads(response.text)
+    if not isinstance(results, list) or len(results) != len(prompts):
+        raise ValueError(f"expected a JSON array of {len(prompts)} drafts")
+    by_task = {r.get("task"): r for r in results if isinstance(r, dict)}
+    tasks = range(1, len(prompts) + 1)
+    if by_task.keys() != set(tasks):
+        raise ValueError("batched drafts don't map one-to-one onto tasks")
+    return [by_task[task] for task in tasks]
+
+
+def gemini_drafter(limiter: AsyncLimiter):
+    """Return draft(prompt) → parsed JSON, micro-batching concurrent prompts into shared Gemini calls.
+
+    A batch whose output can't be mapped back onto its prompts falls back to one
+    retried _generate_draft_json call per prompt. One per enrich_batch run; the
+    gemini_client() is built on first use, so a missing GEMINI_API_KEY fails each
+    contact (counted, job still completes) instead of the whole batch.
+    """
+    queue: list[tuple[str, asyncio.Future]] = []
+    tasks: set[asyncio.Task] = set()  # strong refs so in-flight sends aren't GC'd
+    client = None
+
+    async def send(batch: list[tuple[str, asyncio.Future]]):
+        nonlocal client
+        prompts = [prompt for prompt, _ in batch]
+        try:
+            if client is None:
+                client = gemini_client()
+        except Exception as e:
+            # Not a KeyError: generate_draft would mistake that for bad output and send its generic fallback
+            results = [RuntimeError(f"Gemini client unavailable: {e!r}")] * len(batch)
+        else:
+            try:
+                # Rate limits / server errors are retried as one batch (Retry-After aware) and,
+                # if they persist, fail the batch's contacts — fanning out would only add load
+                results = await _generate_drafts_json(client, limiter, prompts) if len(batch) > 1 else None
+            except ValueError as e:  # malformed or mismatched batch output (incl. JSONDecodeError)
+                logger.warning(
+                    "Batched Gemini draft of %d prompts unusable, falling back per prompt: %s", len(batch), e
+                )
+                results = None
+            except Exception as e:
+                results = [e] * len(batch)
+            if results is None:
+                results = await asyncio.gather(
+                    *(_generate_draft_json(client, limiter, prompt) for prompt in prompts), return_exceptions=True
+                )
+        for (_, fut), result in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(result, BaseException):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+    def dispatch():
+        batch = queue[:]
+        queue.clear()
+        task = asyncio.create_task(send(batch))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def dispatch_later():
+        await asyncio.sleep(DRAFT_BATCH_WINDOW_SEC)
+        if queue:
+            dispatch()
+
+    async def draft(prompt: str) -> dict:
+        fut = asyncio.get_running_loop().create_future()
+        queue.append((prompt, fut))
+        if len(queue) >= DRAFT_BATCH_SIZE:
+            dispatch()
+        elif len(queue) == 1:
+            timer = asyncio.create_task(dispatch_later())
+            tasks.add(timer)
+            timer.add_done_callback(tasks.discard)
+        return await fut
+
+    return draft
+
+
+async def generate_draft(
+    sb,
+    drafter,
     mission_statement: str,
     intent_type: str,
     research_summary: str,
@@ -183,11 +545,7 @@ def generate_draft(
     company_name: str,
     full_name: str,
 ) -> dict:
-    """Call Gemini to generate a draft message + strategy tag."""
-    from google import genai
-
-    client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
-
+    """Generate a draft message + strategy tag via a gemini_drafter() (cached by exact prompt)."""
     prompt = f"""You are a LinkedIn outreach assistant. Generate a personalized connection message.
 
 USER CONTEXT:
@@ -208,44 +566,76 @@ INSTRUCTIONS:
 3. Return ONLY valid JSON (no markdown, no code fences):
 {{"draft_message": "your message here", "strategy_tag": "TAG_HERE"}}"""
 
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt,
-        config={
-            "response_mime_type": "application/json",
-        },
-    )
+    # Exact-match only: the prompt carries the contact's name, so a "similar"
+    # prompt's draft would address the wrong person
+    prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
+    try:
+        cached = (
+            await sb.table("draft_cache")
+            .select("draft_message, strategy_tag")
+            .eq("prompt_hash", prompt_hash)
+            .maybe_single()
+            .execute()
+        )
+    except Exception as e:
+        logger.warning("draft_cache read failed, drafting uncached: %s", e)
+        cached = None
+    if cached and cached.data:
+        return cached.data
 
     try:
-        result = json.loads(response.text)
+        result = await drafter(prompt)
         draft = result.get("draft_message", "")
         tag = result.get("strategy_tag", "DIRECT_PITCH")
 
         if tag not in VALID_STRATEGY_TAGS:
-            logger.warning(f"Gemini returned invalid strategy_tag: {tag}, defaulting to DIRECT_PITCH")
+            logger.warning("Gemini returned invalid strategy_tag: %s, defaulting to DIRECT_PITCH", tag)
             tag = "DIRECT_PITCH"
 
-        return {"draft_message": draft[:300], "strategy_tag": tag}
+        draft_result = {"draft_message": draft[:300], "strategy_tag": tag}
     except (json.JSONDecodeError, AttributeError, KeyError) as e:
-        logger.warning(f"Gemini response parse failure: {e}")
+        logger.warning("Gemini response parse failure: %s", e)
         return {
             "draft_message": f"Hi {full_name}, I'd love to connect and learn more about your work at {company_name}.",
             "strategy_tag": "DIRECT_PITCH",
         }
 
+    try:
+        await sb.table("draft_cache").upsert({"prompt_hash": prompt_hash, **draft_result}).execute()
+    except Exception as e:
+        logger.warning("draft_cache write failed: %s", e)
+    return draft_result
+
 
 # ---------------------------------------------------------------------------
 # Section 6: FastAPI app + CORS
 # ---------------------------------------------------------------------------
 
-web_app = FastAPI(title="PRMSOE API")
+@contextlib.asynccontextmanager
+async def _lifespan(app: FastAPI):
+    yield
+    # Drop queued LOCAL_DEV enrichment so shutdown only waits for the jobs already
+    # running — an atexit hook would run after concurrent.futures has drained them all
+    _enrich_pool.shutdown(wait=False, cancel_futures=True)
+
+
+web_app = FastAPI(title="PRMSOE API", default_response_class=ORJSONResponse, lifespan=_lifespan)
+
+# Explicit origins (comma-separated CORS_ORIGINS overrides) + long max_age so
+# browsers cache preflights instead of re-sending OPTIONS before each POST
+CORS_ORIGINS = [
+    o.strip()
+    for o in os.environ.get("CORS_ORIGINS", "https://prmsoe.vercel.app,http://localhost:3000").split(",")
+    if o.strip()
+]
 
 web_app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=False,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,
 )
 
 
@@ -263,63 +653,62 @@ async def ingest_upload(
     sb = get_supabase()
 
     # Validate user exists
-    profile = sb.table("profiles").select("id, mission_statement, intent_type").eq("id", user_id).execute()
-    if not profile.data:
+    profile = sb.table("profiles").select("id").eq("id", user_id).maybe_single().execute()
+    if not (profile and profile.data):
         raise HTTPException(status_code=404, detail="User profile not found")
 
-    # Read and decode CSV
-    raw_bytes = await file.read()
-    text = raw_bytes.decode("utf-8-sig")
-    lines = text.splitlines()
+    # Decode the spooled upload lazily instead of materializing the whole body
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
 
     # Find the header row (LinkedIn CSVs have preamble lines)
-    header_idx = None
-    for i, line in enumerate(lines):
+    header_line = None
+    for line in text:
         if "First Name" in line:
-            header_idx = i
+            header_line = line
             break
 
-    if header_idx is None:
+    if header_line is None:
         raise HTTPException(status_code=400, detail="CSV missing expected header row with 'First Name'")
 
-    csv_text = "\n".join(lines[header_idx:])
-    reader = csv.DictReader(io.StringIO(csv_text))
+    reader = csv.reader(itertools.chain([header_line], text))
+
+    # Resolve the columns we use once; rows are then read positionally (no per-row dict)
+    header = next(reader)
+    col = {name: header.index(name) for name in CSV_COLUMNS if name in header}
+
+    def field(row: list[str], name: str) -> str:
+        i = col.get(name)
+        return row[i].strip() if i is not None and i < len(row) else ""
 
     contacts_to_insert: list[dict] = []
     skipped = 0
 
     for row in reader:
-        company = (row.get("Company") or "").strip()
+        if not row:
+            continue  # blank line (DictReader skipped these too)
+
+        company = field(row, "Company")
         if not company:
             skipped += 1
             continue
 
-        first = (row.get("First Name") or "").strip()
-        last = (row.get("Last Name") or "").strip()
-        full_name = f"{first} {last}".strip()
+        full_name = f"{field(row, 'First Name')} {field(row, 'Last Name')}".strip()
 
         contacts_to_insert.append({
             "user_id": user_id,
             "full_name": full_name,
             "company_name": company,
-            "raw_role": (row.get("Position") or "").strip(),
-            "linkedin_url": (row.get("URL") or "").strip(),
+            "raw_role": field(row, "Position"),
+            "linkedin_url": field(row, "URL"),
             "status": ContactStatus.NEW.value,
         })
-
-    if len(contacts_to_insert) > 500:
-        raise HTTPException(status_code=400, detail="CSV exceeds 500 contact limit")
+        # Bail out as soon as the limit is crossed — don't parse the rest of an oversize file
+        if len(contacts_to_insert) > MAX_UPLOAD_CONTACTS:
+            raise HTTPException(status_code=400, detail=f"CSV exceeds {MAX_UPLOAD_CONTACTS} contact limit")
 
     if not contacts_to_insert:
-        # Empty CSV — create completed job immediately
-        job = sb.table("enrichment_jobs").insert({
-            "user_id": user_id,
-            "total_contacts": 0,
-            "processed_count": 0,
-            "failed_count": 0,
-            "status": JobStatus.COMPLETED.value,
-            "completed_at": datetime.now(timezone.utc).isoformat(),
-        }).execute()
+        # Empty CSV — the autocomplete trigger marks a 0-contact job COMPLETED on insert
+        job = sb.table("enrichment_jobs").insert({"user_id": user_id, "total_contacts": 0}).execute()
         return {
             "contacts_created": 0,
             "contacts_skipped": skipped,
@@ -329,27 +718,25 @@ async def ingest_upload(
 
     # Bulk insert contacts
     inserted = sb.table("contacts").insert(contacts_to_insert).execute()
-    contact_ids = [c["id"] for c in inserted.data]
-
-    # Create enrichment job
-    job = sb.table("enrichment_jobs").insert({
-        "user_id": user_id,
-        "total_contacts": len(contact_ids),
-        "processed_count": 0,
-        "failed_count": 0,
-        "status": JobStatus.RUNNING.value,
-    }).execute()
+    by_company = sorted(inserted.data, key=lambda c: c["company_name"].lower().strip())
+    contact_ids = [c["id"] for c in by_company]
+
+    # Create enrichment job (counters default to 0, status to RUNNING)
+    job = sb.table("enrichment_jobs").insert({"user_id": user_id, "total_contacts": len(contact_ids)}).execute()
     job_id = job.data[0]["id"]
 
     # Spawn background enrichment
     if LOCAL_DEV:
-        threading.Thread(
-            target=enrich_batch.local,
-            kwargs={"job_id": job_id, "contact_ids": contact_ids},
-            daemon=True,
-        ).start()
+        _enrich_pool.submit(enrich_batch.local, job_id=job_id, contact_ids=contact_ids)
     else:
-        enrich_batch.spawn(job_id=job_id, contact_ids=contact_ids)
+        chunks = [[]]
+        for _, group in itertools.groupby(by_company, key=lambda c: c["company_name"].lower().strip()):
+            ids = [c["id"] for c in group]
+            if chunks[-1] and len(chunks[-1]) + len(ids) > ENRICH_CHUNK_SIZE:
+                chunks.append([])
+            chunks[-1].extend(ids)
+        for chunk in chunks:
+            enrich_batch.spawn(job_id=job_id, contact_ids=chunk, shards=len(chunks))
 
     return {
         "contacts_created": len(contact_ids),
@@ -363,10 +750,17 @@ async def ingest_upload(
 async def ingest_status(job_id: str, user_id: str = Query(...)):
     """Return enrichment job progress."""
     sb = get_supabase()
-    result = sb.table("enrichment_jobs").select("*").eq("id", job_id).eq("user_id", user_id).execute()
-    if not result.data:
+    result = (
+        sb.table("enrichment_jobs")
+        .select("id, status, total_contacts, processed_count, failed_count")
+        .eq("id", job_id)
+        .eq("user_id", user_id)
+        .maybe_single()
+        .execute()
+    )
+    if not (result and result.data):
         raise HTTPException(status_code=404, detail="Job not found")
-    row = result.data[0]
+    row = result.data
     return {
         "job_id": row["id"],
         "status": row["status"],
@@ -418,49 +812,33 @@ async def feed_drafts(
     """Return contacts with DRAFT_READY status and their research."""
     sb = get_supabase()
 
-    # Get total count
-    count_resp = (
-        sb.table("contacts")
-        .select("id", count="exact")
+    # One query: drafts_with_research pre-joins research and filters DRAFT_READY
+    drafts_resp = (
+        sb.table("drafts_with_research")
+        .select("*", count="exact")
         .eq("user_id", user_id)
-        .eq("status", ContactStatus.DRAFT_READY.value)
-        .execute()
-    )
-    total = count_resp.count or 0
-
-    # Get paginated contacts
-    contacts_resp = (
-        sb.table("contacts")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("status", ContactStatus.DRAFT_READY.value)
         .order("created_at", desc=True)
         .range(offset, offset + limit - 1)
         .execute()
     )
+    total = drafts_resp.count or 0
 
     drafts = []
-    if contacts_resp.data:
-        contact_ids = [c["id"] for c in contacts_resp.data]
-        research_resp = sb.table("research").select("*").in_("contact_id", contact_ids).execute()
-        research_map = {r["contact_id"]: r for r in (research_resp.data or [])}
-
-        for c in contacts_resp.data:
-            r = research_map.get(c["id"], {})
-            drafts.append({
-                "contact_id": c["id"],
-                "full_name": c["full_name"],
-                "raw_role": c["raw_role"],
-                "company_name": c["company_name"],
-                "linkedin_url": c["linkedin_url"],
-                "draft_message": c["draft_message"],
-                "strategy_tag": c["strategy_tag"],
-                "research": {
-                    "news_summary": r.get("news_summary", ""),
-                    "pain_points": r.get("pain_points", ""),
-                    "source_url": r.get("source_url", ""),
-                },
-            })
+    for c in drafts_resp.data or []:
+        drafts.append({
+            "contact_id": c["id"],
+            "full_name": c["full_name"],
+            "raw_role": c["raw_role"],
+            "company_name": c["company_name"],
+            "linkedin_url": c["linkedin_url"],
+            "draft_message": c["draft_message"],
+            "strategy_tag": c["strategy_tag"],
+            "research": {
+                "news_summary": c.get("news_summary") or "",
+                "pain_points": c.get("pain_points") or "",
+                "source_url": c.get("source_url") or "",
+            },
+        })
 
     return {
         "drafts": drafts,
@@ -475,29 +853,25 @@ async def action_send(req: SendRequest):
     sb = get_supabase()
 
     # Verify contact exists
-    contact = sb.table("contacts").select("id, status").eq("id", req.contact_id).execute()
-    if not contact.data:
+    contact = sb.table("contacts").select("id, user_id").eq("id", req.contact_id).maybe_single().execute()
+    if not (contact and contact.data):
         raise HTTPException(status_code=404, detail="Contact not found")
 
-    now = datetime.now(timezone.utc)
-    feedback_due = now + timedelta(days=3)
-
     # Update contact status
     sb.table("contacts").update({"status": ContactStatus.SENT.value}).eq("id", req.contact_id).execute()
 
-    # Insert outreach attempt
+    # Insert outreach attempt (sent_at = now(), feedback_due_at = now() + 3 days by default)
     outreach = sb.table("outreach_attempts").insert({
         "contact_id": req.contact_id,
         "strategy_tag": req.strategy_tag,
         "message_body": req.message_body,
-        "sent_at": now.isoformat(),
-        "feedback_due_at": feedback_due.isoformat(),
         "feedback_status": FeedbackStatus.PENDING.value,
     }).execute()
+    cache_invalidate(_analytics_cache, contact.data["user_id"])
 
     return {
         "outreach_id": outreach.data[0]["id"],
-        "feedback_due_at": feedback_due.isoformat(),
+        "feedback_due_at": outreach.data[0]["feedback_due_at"],
     }
 
 
@@ -553,84 +927,39 @@ async def feedback_swipe(req: SwipeRequest):
     sb = get_supabase()
 
     # Validate outcome
-    if req.outcome not in {t.value for t in OutcomeType}:
+    if req.outcome not in VALID_OUTCOMES:
         raise HTTPException(status_code=400, detail=f"Invalid outcome: {req.outcome}")
 
-    result = sb.table("outreach_attempts").select("id").eq("id", req.outreach_id).execute()
-    if not result.data:
+    result = (
+        sb.table("outreach_attempts")
+        .select("id, contacts(user_id)")
+        .eq("id", req.outreach_id)
+        .maybe_single()
+        .execute()
+    )
+    if not (result and result.data):
         raise HTTPException(status_code=404, detail="Outreach attempt not found")
 
     sb.table("outreach_attempts").update({
         "outcome": req.outcome,
         "feedback_status": FeedbackStatus.COMPLETED.value,
     }).eq("id", req.outreach_id).execute()
+    cache_invalidate(_analytics_cache, (result.data.get("contacts") or {}).get("user_id", ""))
 
     return {"ok": True}
 
 
 @web_app.get("/analytics/dashboard")
 async def analytics_dashboard(user_id: str = Query(...)):
-    """Aggregate outreach metrics for user."""
-    sb = get_supabase()
-
-    # Get user's contact IDs
-    contacts = sb.table("contacts").select("id").eq("user_id", user_id).execute()
-    if not contacts.data:
-        return {
-            "total_sent": 0,
-            "total_completed": 0,
-            "total_replied": 0,
-            "global_reply_rate": 0.0,
-            "by_strategy": [],
-        }
-
-    contact_ids = [c["id"] for c in contacts.data]
-
-    # Build contact lookup for replied message details
-    contact_info = sb.table("contacts").select("id, full_name, company_name").in_("id", contact_ids).execute()
-    contact_map = {c["id"]: c for c in (contact_info.data or [])}
+    """Aggregate outreach metrics for user (computed in Postgres by analytics_for_user)."""
+    cached = cache_get(_analytics_cache, user_id)
+    if cached is not None:
+        return cached
 
-    attempts = sb.table("outreach_attempts").select("*").in_("contact_id", contact_ids).execute()
-    rows = attempts.data or []
-
-    total_sent = len(rows)
-    total_completed = sum(1 for r in rows if r.get("feedback_status") == FeedbackStatus.COMPLETED.value)
-    total_replied = sum(1 for r in rows if r.get("outcome") == OutcomeType.REPLIED.value)
-    global_reply_rate = round(total_replied / total_completed, 3) if total_completed > 0 else 0.0
-
-    # Group by strategy
-    strategy_buckets: dict[str, dict] = {}
-    for r in rows:
-        tag = r.get("strategy_tag", "UNKNOWN")
-        bucket = strategy_buckets.setdefault(tag, {"sent": 0, "replied": 0, "replied_messages": []})
-        bucket["sent"] += 1
-        if r.get("outcome") == OutcomeType.REPLIED.value:
-            bucket["replied"] += 1
-            c = contact_map.get(r["contact_id"], {})
-            bucket["replied_messages"].append({
-                "full_name": c.get("full_name", ""),
-                "company_name": c.get("company_name", ""),
-                "message_body": r.get("message_body", ""),
-                "sent_at": r.get("sent_at", ""),
-            })
-
-    by_strategy = []
-    for tag, b in sorted(strategy_buckets.items()):
-        by_strategy.append({
-            "strategy_tag": tag,
-            "sent": b["sent"],
-            "replied": b["replied"],
-            "reply_rate": round(b["replied"] / b["sent"], 3) if b["sent"] > 0 else 0.0,
-            "replied_messages": b["replied_messages"],
-        })
-
-    return {
-        "total_sent": total_sent,
-        "total_completed": total_completed,
-        "total_replied": total_replied,
-        "global_reply_rate": global_reply_rate,
-        "by_strategy": by_strategy,
-    }
+    sb = get_supabase()
+    result = sb.rpc("analytics_for_user", {"uid": user_id}).execute().data
+    cache_set(_analytics_cache, user_id, result)
+    return result
 
 
 # ---------------------------------------------------------------------------
@@ -655,13 +984,17 @@ async def composio_connect(req: ComposioConnectRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"/composio/connect error: {e}")
+        logger.error("/composio/connect error: %s", e)
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
 
 @web_app.get("/composio/status")
 async def composio_status(user_id: str = Query(...)):
     """Check if user has an active Gmail connection via Composio."""
+    cached = cache_get(_status_cache, user_id)
+    if cached is not None:
+        return cached
+
     composio = get_composio()
 
     connected_accounts = composio.connected_accounts.list(
@@ -669,11 +1002,10 @@ async def composio_status(user_id: str = Query(...)):
         toolkit_slugs=["gmail"],
     )
 
-    for account in connected_accounts.items:
-        if account.status == "ACTIVE":
-            return {"connected": True}
-
-    return {"connected": False}
+    connected = any(account.status == "ACTIVE" for account in connected_accounts.items)
+    result = {"connected": connected}
+    cache_set(_status_cache, user_id, result)
+    return result
 
 
 @web_app.post("/composio/disconnect")
@@ -691,17 +1023,30 @@ async def composio_disconnect(req: AutoDetectRequest):
             if account.status == "ACTIVE":
                 composio.connected_accounts.delete(account.id)
 
+        cache_invalidate(_status_cache, req.user_id)
         return {"ok": True}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"/composio/disconnect error: {e}")
+        logger.error("/composio/disconnect error: %s", e)
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
 
 DEMO_USER_ID = "c877835e-4609-4075-9892-84bf9c3e8f97"
 
 
+def build_name_automaton(names):
+    """Aho-Corasick automaton over lowercased contact names — one pass per email
+    finds every name it contains, instead of a substring scan per (email, name)."""
+    import ahocorasick
+
+    automaton = ahocorasick.Automaton()
+    for name in names:
+        automaton.add_word(name, name)
+    automaton.make_automaton()
+    return automaton
+
+
 @web_app.post("/feedback/auto-detect")
 async def feedback_auto_detect(req: AutoDetectRequest):
     """Scan Gmail for LinkedIn reply notifications and auto-mark matching outreach as REPLIED."""
@@ -719,23 +1064,30 @@ async def feedback_auto_detect(req: AutoDetectRequest):
             ]
 
             contacts = sb.table("contacts").select("id, full_name, company_name").eq("user_id", req.user_id).execute()
-            if not contacts.data:
+
+            # Build lookup once: full_name.lower() → [contact rows]
+            name_index: dict[str, list[dict]] = {}
+            for c in contacts.data or []:
+                name = (c.get("full_name") or "").lower().strip()
+                if name:
+                    name_index.setdefault(name, []).append(c)
+            if not name_index:
                 return {"detected": [], "count": 0}
-            contact_map = {c["id"]: c for c in contacts.data}
+            automaton = build_name_automaton(name_index)
 
             # Match mock emails against contacts by name
             matched_contact_ids: set[str] = set()
             detected = []
             for email in mock_emails:
                 text = (email["subject"] + " " + email["body"]).lower()
-                for c in contacts.data:
-                    name = c.get("full_name", "").lower().strip()
-                    if name and name in text and c["id"] not in matched_contact_ids:
-                        matched_contact_ids.add(c["id"])
-                        detected.append({
-                            "full_name": c.get("full_name", ""),
-                            "company_name": c.get("company_name", ""),
-                        })
+                for _, name in automaton.iter(text):
+                    for c in name_index[name]:
+                        if c["id"] not in matched_contact_ids:
+                            matched_contact_ids.add(c["id"])
+                            detected.append({
+                                "full_name": c.get("full_name", ""),
+                                "company_name": c.get("company_name", ""),
+                            })
 
             # Mark matching outreach attempts as REPLIED so cards disappear from queue
             if matched_contact_ids:
@@ -746,12 +1098,13 @@ async def feedback_auto_detect(req: AutoDetectRequest):
                     .eq("feedback_status", FeedbackStatus.PENDING.value)
                     .execute()
                 )
-                for a in (attempts.data or []):
+                if attempts.data:
                     sb.table("outreach_attempts").update({
                         "outcome": OutcomeType.REPLIED.value,
                         "feedback_status": FeedbackStatus.COMPLETED.value,
-                    }).eq("id", a["id"]).execute()
+                    }).in_("id", [a["id"] for a in attempts.data]).execute()
 
+            cache_invalidate(_analytics_cache, req.user_id)
             return {"detected": detected, "count": len(detected)}
 
         composio = get_composio()
@@ -784,6 +1137,9 @@ async def feedback_auto_detect(req: AutoDetectRequest):
             if name:
                 name_to_attempts.setdefault(name, []).append(a)
 
+        if not name_to_attempts:
+            return {"detected": [], "count": 0}
+
         # 3. Get active Gmail connected account
         connected_accounts = composio.connected_accounts.list(
             user_ids=[req.user_id],
@@ -816,7 +1172,9 @@ async def feedback_auto_detect(req: AutoDetectRequest):
         if isinstance(emails, dict):
             emails = [emails]
 
-        # 5. Match emails to pending contacts
+        # 5. Match emails to pending contacts — one Aho-Corasick pass per email
+        automaton = build_name_automaton(name_to_attempts)
+
         detected = []
         matched_attempt_ids = set()
 
@@ -825,29 +1183,29 @@ async def feedback_auto_detect(req: AutoDetectRequest):
             body = (email.get("body") or email.get("snippet") or "").lower()
             text = subject + " " + body
 
-            for name, attempt_list in name_to_attempts.items():
-                if name in text:
-                    for a in attempt_list:
-                        if a["id"] not in matched_attempt_ids:
-                            matched_attempt_ids.add(a["id"])
-                            c = contact_map.get(a["contact_id"], {})
-                            detected.append({
-                                "full_name": c.get("full_name", ""),
-                                "company_name": c.get("company_name", ""),
-                            })
+            for _, name in automaton.iter(text):
+                for a in name_to_attempts[name]:
+                    if a["id"] not in matched_attempt_ids:
+                        matched_attempt_ids.add(a["id"])
+                        c = contact_map.get(a["contact_id"], {})
+                        detected.append({
+                            "full_name": c.get("full_name", ""),
+                            "company_name": c.get("company_name", ""),
+                        })
 
-        # 6. Update matched outreach attempts → REPLIED + COMPLETED
-        for attempt_id in matched_attempt_ids:
+        # 6. Update matched outreach attempts → REPLIED + COMPLETED (single batched update)
+        if matched_attempt_ids:
             sb.table("outreach_attempts").update({
                 "outcome": OutcomeType.REPLIED.value,
                 "feedback_status": FeedbackStatus.COMPLETED.value,
-            }).eq("id", attempt_id).execute()
+            }).in_("id", list(matched_attempt_ids)).execute()
 
+        cache_invalidate(_analytics_cache, req.user_id)
         return {"detected": detected, "count": len(detected)}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"/feedback/auto-detect error: {e}")
+        logger.error("/feedback/auto-detect error: %s", e)
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
 
@@ -860,106 +1218,218 @@ async def feedback_auto_detect(req: AutoDetectRequest):
     secrets=[modal.Secret.from_name("prmsoe-secrets")],
     timeout=3600,
 )
-def enrich_batch(job_id: str, contact_ids: list[str]):
-    """Process contacts sequentially: research via You.com, draft via Gemini."""
-    sb = get_supabase()
+def enrich_batch(job_id: str, contact_ids: list[str], shards: int = 1):
+    """Research via You.com + draft via Gemini, up to ENRICH_CONCURRENCY contacts at a time.
 
-    # Fetch user profile for mission/intent context
-    job = sb.table("enrichment_jobs").select("user_id").eq("id", job_id).execute()
-    if not job.data:
-        logger.error(f"Job {job_id} not found")
-        return
-    user_id = job.data[0]["user_id"]
+    A job may be split across `shards` concurrent calls (one container each); job
+    counters are bumped atomically, and provider rate limits are divided among them.
+    """
+    try:
+        asyncio.run(_enrich_batch(job_id, contact_ids, shards))
+    except Exception:
+        # Without every contact counted the autocomplete trigger never fires — give the
+        # job a terminal state so /ingest/status pollers stop
+        logger.exception("enrich_batch for job %s failed, marking job FAILED", job_id)
+        try:
+            get_supabase().rpc("fail_job", {"job": job_id}).execute()
+        except Exception as e:
+            logger.error("Failed to mark job %s FAILED: %s", job_id, e)
+        raise
 
-    profile = sb.table("profiles").select("mission_statement, intent_type").eq("id", user_id).execute()
-    mission = profile.data[0]["mission_statement"] if profile.data else ""
-    intent = profile.data[0]["intent_type"] if profile.data else "VALIDATION"
 
-    for i, contact_id in enumerate(contact_ids):
-        try:
-            # Set status to RESEARCHING
-            sb.table("contacts").update({"status": ContactStatus.RESEARCHING.value}).eq("id", contact_id).execute()
-
-            # Fetch contact details
-            contact = sb.table("contacts").select("full_name, company_name, raw_role").eq("id", contact_id).execute()
-            if not contact.data:
-                logger.warning(f"Contact {contact_id} not found, skipping")
-                sb.table("enrichment_jobs").update({
-                    "failed_count": sb.table("enrichment_jobs").select("failed_count").eq("id", job_id).execute().data[0]["failed_count"] + 1,
-                }).eq("id", job_id).execute()
-                continue
+async def _enrich_batch(job_id: str, contact_ids: list[str], shards: int = 1):
+    sb = await get_async_supabase()
 
-            c = contact.data[0]
-            company = c["company_name"]
-            full_name = c["full_name"]
-            raw_role = c["raw_role"]
+    # Fetch user profile for mission/intent context
+    job = await sb.table("enrichment_jobs").select("user_id").eq("id", job_id).maybe_single().execute()
+    if not (job and job.data):
+        logger.error("Job %s not found", job_id)
+        return
+    user_id = job.data["user_id"]
 
-            # You.com search (non-fatal — enrichment continues without research)
-            search_query = f"{company} recent news problems"
-            parsed = {"news_summary": "", "pain_points": "", "source_url": ""}
-            raw_response = {}
+    profile = (
+        await sb.table("profiles")
+        .select("mission_statement, intent_type")
+        .eq("id", user_id)
+        .maybe_single()
+        .execute()
+    )
+    row = profile.data if profile else None
+    mission = row["mission_statement"] if row else ""
+    intent = row["intent_type"] if row else "VALIDATION"
+
+    # Resuming a restarted job: contacts with research, or with a job_failures row for
+    # this job, were already counted by an earlier flush — only the remainder is enriched
+    # (every in.() filter is split into IN_FILTER_BATCH_SIZE-id chunks to keep URLs short)
+    id_chunks = [list(chunk) for chunk in itertools.batched(contact_ids, IN_FILTER_BATCH_SIZE)]
+    seen = await asyncio.gather(
+        *(sb.table("research").select("contact_id").in_("contact_id", chunk).execute() for chunk in id_chunks),
+        *(
+            sb.table("job_failures").select("contact_id").eq("job_id", job_id).in_("contact_id", chunk).execute()
+            for chunk in id_chunks
+        ),
+    )
+    done_ids = {r["contact_id"] for res in seen for r in (res.data or [])}
+    if done_ids:
+        logger.info("Job %s: skipping %d already-counted contacts", job_id, len(done_ids))
+        contact_ids = [cid for cid in contact_ids if cid not in done_ids]
+        if not contact_ids:
+            return
+
+    # Set status to RESEARCHING for the whole batch; the update returns the updated
+    # rows, so it doubles as the bulk fetch of contact details
+    updated = await asyncio.gather(*(
+        sb.table("contacts").update({"status": ContactStatus.RESEARCHING.value}).in_("id", list(chunk)).execute()
+        for chunk in itertools.batched(contact_ids, IN_FILTER_BATCH_SIZE)
+    ))
+    contact_map = {c["id"]: c for res in updated for c in (res.data or [])}
+
+    sem = asyncio.Semaphore(ENRICH_CONCURRENCY)
+    # Per batch (not module-level): each enrich_batch run has its own event loop.
+    # Each of `shards` containers gets an equal slice of the rate, bucket included,
+    # so even their combined startup burst stays at ~RATE
+    youcom_limiter = AsyncLimiter(max(1, YOUCOM_RATE_PER_SEC // shards), 1)
+    gemini_limiter = AsyncLimiter(max(1, GEMINI_RATE_PER_SEC // shards), 1)
+    pending: list[dict] = []  # enriched rows awaiting the next enrich_many flush
+    research: dict[str, asyncio.Task] = {}  # company_norm → one shared research task per company
+    failures: list[dict] = []  # {contact_id, reason} not yet written via record_failures
+    unrecorded = 0  # contacts whose outcome couldn't be written — the job can't complete
+
+    async def flush():
+        """Persist enriched rows + failures so far (keeps the job's progress counters live)."""
+        nonlocal unrecorded
+        rows, failed = pending[:], failures[:]
+        pending.clear()
+        failures.clear()
+        if rows:
+            try:
+                # One orjson pass over the whole batch (raw_response dominates the payload)
+                if pool:
+                    await pool.execute("SELECT enrich_many($1::uuid, $2::jsonb)", job_id, orjson.dumps(rows).decode())
+                else:
+                    resp = await rest.post("/rpc/enrich_many", content=orjson.dumps({"job": job_id, "rows": rows}))
+                    resp.raise_for_status()
+            except Exception as e:
+                logger.error("Failed to persist %d enriched contacts: %s", len(rows), e)
+                failed += [{"contact_id": r["contact_id"], "reason": str(e)} for r in rows]
+        if failed:
             try:
-                raw_response = search_youcom(search_query)
-                parsed = parse_youcom_response(raw_response)
-            except Exception as search_err:
-                logger.warning(f"Research failed for {contact_id}, proceeding without: {search_err}")
-
-            # Insert research
-            sb.table("research").insert({
-                "contact_id": contact_id,
-                "news_summary": parsed["news_summary"],
-                "pain_points": parsed["pain_points"],
-                "source_url": parsed["source_url"],
-                "raw_response": raw_response,
-            }).execute()
-
-            # Generate draft via Gemini
-            research_text = f"News: {parsed['news_summary']}\nPain points: {parsed['pain_points']}"
-            draft_result = generate_draft(
-                mission_statement=mission,
-                intent_type=intent,
-                research_summary=research_text,
-                raw_role=raw_role,
-                company_name=company,
-                full_name=full_name,
+                # Inserts job_failures + bumps failed_count together, skipping already-recorded ones
+                resp = await rest.post("/rpc/record_failures", content=orjson.dumps({"job": job_id, "rows": failed}))
+                resp.raise_for_status()
+            except Exception as e:
+                logger.error("Failed to record %d failures: %s", len(failed), e)
+                unrecorded += len(failed)
+
+    async def enrich(i: int, contact_id: str) -> dict:
+        c = contact_map.get(contact_id)
+        if not c:
+            raise LookupError("contact not found")
+        # Wait for research outside the semaphore so slots go to contacts ready to draft
+        parsed, raw_response = await research[c["company_name"].lower().strip()]
+        async with sem:
+            row = await _enrich_contact(
+                sb, drafter, contact_id, c, mission, intent, parsed, raw_response
             )
+        logger.info("Enriched contact %d/%d: %s @ %s", i + 1, len(contact_ids), c["full_name"], c["company_name"])
+        return row
 
-            # Update contact with draft
-            sb.table("contacts").update({
-                "draft_message": draft_result["draft_message"],
-                "strategy_tag": draft_result["strategy_tag"],
-                "status": ContactStatus.DRAFT_READY.value,
-            }).eq("id", contact_id).execute()
+    async def run(i: int, contact_id: str):
+        try:
+            pending.append(await enrich(i, contact_id))
+        except Exception as e:
+            logger.error("Failed to enrich contact %s: %s", contact_id, e)
+            failures.append({"contact_id": contact_id, "reason": str(e)})
+        if len(pending) + len(failures) >= ENRICH_FLUSH_SIZE:
+            await flush()
 
-            # Increment processed count
-            current = sb.table("enrichment_jobs").select("processed_count").eq("id", job_id).execute()
-            sb.table("enrichment_jobs").update({
-                "processed_count": current.data[0]["processed_count"] + 1,
-            }).eq("id", job_id).execute()
+    drafter = gemini_drafter(gemini_limiter)
+    try:
+        pool = await db_pool()
+    except Exception as e:
+        logger.error("asyncpg pool unavailable, writing via PostgREST: %s", e)
+        pool = None
+    async with contextlib.AsyncExitStack() as stack:
+        # No You.com client (e.g. YOUCOM_API_KEY unset) only costs research, as it always
+        # has — drafts are still written and every contact is counted
+        try:
+            client = await stack.enter_async_context(youcom_client())
+        except Exception as e:
+            logger.error("You.com client unavailable, drafting without fresh research: %s", e)
+            client = None
+        rest = await stack.enter_async_context(postgrest_client())
+
+        # Two-stage pipeline: every distinct company's research starts now (paced by
+        # youcom_limiter), and each contact drafts as soon as its company resolves
+        for c in contact_map.values():
+            company_norm = c["company_name"].lower().strip()
+            if company_norm not in research:
+                research[company_norm] = asyncio.create_task(
+                    research_company(sb, client, youcom_limiter, c["company_name"])
+                )
+        try:
+            await asyncio.gather(*(run(i, contact_id) for i, contact_id in enumerate(contact_ids)))
+        finally:
+            # Whatever finished before an unexpected error/cancellation still gets counted
+            await flush()
+            if pool:
+                await pool.close()
 
-            logger.info(f"Enriched contact {i + 1}/{len(contact_ids)}: {full_name} @ {company}")
+    if unrecorded:
+        raise RuntimeError(f"{unrecorded} contact outcomes could not be recorded")
 
-        except Exception as e:
-            logger.error(f"Failed to enrich contact {contact_id}: {e}")
-            try:
-                current = sb.table("enrichment_jobs").select("failed_count").eq("id", job_id).execute()
-                sb.table("enrichment_jobs").update({
-                    "failed_count": current.data[0]["failed_count"] + 1,
-                }).eq("id", job_id).execute()
-            except Exception as inner_e:
-                logger.error(f"Failed to update failed_count: {inner_e}")
+    # COMPLETED + completed_at are set by the enrichment_jobs_autocomplete trigger
+    # once processed_count + failed_count reaches total_contacts
+    logger.info("Job %s finished", job_id)
 
-        # Rate limit delay (skip after last contact)
-        if i < len(contact_ids) - 1:
-            time.sleep(2)
 
-    # Mark job completed
-    sb.table("enrichment_jobs").update({
-        "status": JobStatus.COMPLETED.value,
-        "completed_at": datetime.now(timezone.utc).isoformat(),
-    }).eq("id", job_id).execute()
+async def research_company(
+    sb, client: httpx.AsyncClient | None, limiter: AsyncLimiter, company: str
+) -> tuple[dict, dict]:
+    """You.com research for one company → (parsed fields, raw response); non-fatal."""
+    try:
+        raw_response = await search_youcom_cached(sb, client, limiter, company)
+        return parse_youcom_response(raw_response), raw_response
+    except Exception as search_err:
+        logger.warning("Research failed for %s, proceeding without: %s", company, search_err)
+        return {"news_summary": "", "pain_points": "", "source_url": ""}, {}
+
+
+async def _enrich_contact(
+    sb,
+    drafter,
+    contact_id: str,
+    c: dict,
+    mission: str,
+    intent: str,
+    parsed: dict,
+    raw_response: dict,
+) -> dict:
+    """Draft a single contact from its company's research; returns the row for enrich_many."""
+    company = c["company_name"]
+    full_name = c["full_name"]
+    raw_role = c["raw_role"]
+
+    # Generate draft via Gemini
+    research_text = f"News: {parsed['news_summary']}\nPain points: {parsed['pain_points']}"
+    draft_result = await generate_draft(
+        sb,
+        drafter,
+        mission_statement=mission,
+        intent_type=intent,
+        research_summary=research_text,
+        raw_role=raw_role,
+        company_name=company,
+        full_name=full_name,
+    )
 
-    logger.info(f"Job {job_id} completed")
+    return {
+        "contact_id": contact_id,
+        **parsed,
+        "raw_response": raw_response,
+        "draft_message": draft_result["draft_message"],
+        "strategy_tag": draft_result["strategy_tag"],
+    }
 
 
 # ---------------------------------------------------------------------------
@@ -982,8 +1452,8 @@ def fastapi_app():
 if __name__ == "__main__":
     import uvicorn
 
+    # .env is already loaded above. Reload needs an import string (the reloader's worker
+    # re-imports "app", inheriting LOCAL_DEV); without reload, serve this web_app directly
     os.environ["LOCAL_DEV"] = "true"
-    # Re-trigger dotenv load now that LOCAL_DEV is set
-    from dotenv import load_dotenv
-    load_dotenv()
-    uvicorn.run("app:web_app", host="0.0.0.0", port=8000, reload=True)
+    reload = "MODAL_ENVIRONMENT" not in os.environ
+    uvicorn.run("app:web_app" if reload else web_app, host="0.0.0.0", port=8000, reload=reload)
@@ -0,0 +1,10 @@
+-- Atomic failed_count bump for enrich_batch (replaces read-then-write from the worker)
+
+CREATE OR REPLACE FUNCTION increment_failed(job_id uuid)
+RETURNS void
+LANGUAGE sql
+AS $$
+  UPDATE enrichment_jobs
+  SET failed_count = failed_count + 1
+  WHERE id = job_id;
+$$;
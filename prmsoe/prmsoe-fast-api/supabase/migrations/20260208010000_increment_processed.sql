@@ -0,0 +1,10 @@
+-- Atomic processed_count bump — enrich_batch finishes contacts concurrently
+
+CREATE OR REPLACE FUNCTION increment_processed(job_id uuid)
+RETURNS void
+LANGUAGE sql
+AS $$
+  UPDATE enrichment_jobs
+  SET processed_count = processed_count + 1
+  WHERE id = job_id;
+$$;
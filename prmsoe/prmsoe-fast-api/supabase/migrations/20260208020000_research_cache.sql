@@ -0,0 +1,9 @@
+-- You.com response cache — contacts from the same company share a search query
+
+CREATE TABLE IF NOT EXISTS research_cache (
+  query_hash text PRIMARY KEY,
+  response jsonb NOT NULL,
+  created_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_research_cache_created ON research_cache(created_at);
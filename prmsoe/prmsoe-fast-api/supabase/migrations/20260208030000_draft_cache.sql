@@ -0,0 +1,8 @@
+-- Gemini draft cache — identical prompts (re-uploaded contacts, retried jobs) reuse the draft
+
+CREATE TABLE IF NOT EXISTS draft_cache (
+  prompt_hash text PRIMARY KEY,
+  draft_message text NOT NULL,
+  strategy_tag strategy_tag NOT NULL,
+  created_at timestamptz DEFAULT now()
+);
@@ -0,0 +1,72 @@
+-- /analytics/dashboard aggregation in one call — returns the endpoint's response JSON
+
+CREATE OR REPLACE FUNCTION analytics_for_user(uid uuid)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+  WITH attempts AS (
+    SELECT
+      COALESCE(o.strategy_tag::text, 'UNKNOWN') AS strategy_tag,
+      o.feedback_status,
+      o.outcome,
+      o.message_body,
+      o.sent_at,
+      c.full_name,
+      c.company_name
+    FROM outreach_attempts o
+    JOIN contacts c ON c.id = o.contact_id
+    WHERE c.user_id = uid
+  ),
+  totals AS (
+    SELECT
+      count(*) AS total_sent,
+      count(*) FILTER (WHERE feedback_status = 'COMPLETED') AS total_completed,
+      count(*) FILTER (WHERE outcome = 'REPLIED') AS total_replied
+    FROM attempts
+  ),
+  by_strategy AS (
+    SELECT
+      strategy_tag,
+      count(*) AS sent,
+      count(*) FILTER (WHERE outcome = 'REPLIED') AS replied,
+      COALESCE(
+        jsonb_agg(
+          jsonb_build_object(
+            'full_name', full_name,
+            'company_name', company_name,
+            'message_body', message_body,
+            'sent_at', sent_at
+          ) ORDER BY sent_at
+        ) FILTER (WHERE outcome = 'REPLIED'),
+        '[]'::jsonb
+      ) AS replied_messages
+    FROM attempts
+    GROUP BY strategy_tag
+  )
+  SELECT jsonb_build_object(
+    'total_sent', t.total_sent,
+    'total_completed', t.total_completed,
+    'total_replied', t.total_replied,
+    'global_reply_rate', CASE
+      WHEN t.total_completed > 0 THEN round(t.total_replied::numeric / t.total_completed, 3)
+      ELSE 0.0
+    END,
+    'by_strategy', COALESCE(
+      (
+        SELECT jsonb_agg(
+          jsonb_build_object(
+            'strategy_tag', s.strategy_tag,
+            'sent', s.sent,
+            'replied', s.replied,
+            'reply_rate', round(s.replied::numeric / s.sent, 3),
+            'replied_messages', s.replied_messages
+          ) ORDER BY s.strategy_tag COLLATE "C"
+        )
+        FROM by_strategy s
+      ),
+      '[]'::jsonb
+    )
+  )
+  FROM totals t;
+$$;
@@ -0,0 +1,12 @@
+-- /feed/drafts source: DRAFT_READY contacts pre-joined with their research row
+
+CREATE OR REPLACE VIEW drafts_with_research
+WITH (security_invoker = true) AS
+SELECT
+  c.*,
+  r.news_summary,
+  r.pain_points,
+  r.source_url
+FROM contacts c
+LEFT JOIN research r ON r.contact_id = c.id
+WHERE c.status = 'DRAFT_READY';
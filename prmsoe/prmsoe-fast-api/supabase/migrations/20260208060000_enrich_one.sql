@@ -0,0 +1,30 @@
+-- Persist one enriched contact in a single transaction: research row, draft, job progress
+
+CREATE OR REPLACE FUNCTION enrich_one(
+  cid uuid,
+  job uuid,
+  news text,
+  pain text,
+  url text,
+  raw jsonb,
+  draft text,
+  tag text
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO research (contact_id, news_summary, pain_points, source_url, raw_response)
+  VALUES (cid, news, pain, url, raw);
+
+  UPDATE contacts
+  SET draft_message = draft,
+      strategy_tag = tag::strategy_tag,
+      status = 'DRAFT_READY'
+  WHERE id = cid;
+
+  UPDATE enrichment_jobs
+  SET processed_count = processed_count + 1
+  WHERE id = job;
+END;
+$$;
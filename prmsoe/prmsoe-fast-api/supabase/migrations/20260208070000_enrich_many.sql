@@ -0,0 +1,26 @@
+-- Persist a flush of enriched contacts in one transaction (batched form of enrich_one)
+-- rows: [{contact_id, news_summary, pain_points, source_url, raw_response, draft_message, strategy_tag}, ...]
+
+CREATE OR REPLACE FUNCTION enrich_many(job uuid, rows jsonb)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO research (contact_id, news_summary, pain_points, source_url, raw_response)
+  SELECT r.contact_id, r.news_summary, r.pain_points, r.source_url, r.raw_response
+  FROM jsonb_to_recordset(rows) AS r(
+    contact_id uuid, news_summary text, pain_points text, source_url text, raw_response jsonb
+  );
+
+  UPDATE contacts c
+  SET draft_message = r.draft_message,
+      strategy_tag = r.strategy_tag,
+      status = 'DRAFT_READY'
+  FROM jsonb_to_recordset(rows) AS r(contact_id uuid, draft_message text, strategy_tag strategy_tag)
+  WHERE c.id = r.contact_id;
+
+  UPDATE enrichment_jobs
+  SET processed_count = processed_count + jsonb_array_length(rows)
+  WHERE id = job;
+END;
+$$;
@@ -0,0 +1,11 @@
+-- Atomic job counter bump by arbitrary amounts — enrich_batch tallies locally and flushes once
+
+CREATE OR REPLACE FUNCTION bump_job(job uuid, processed int, failed int)
+RETURNS void
+LANGUAGE sql
+AS $$
+  UPDATE enrichment_jobs
+  SET processed_count = processed_count + processed,
+      failed_count = failed_count + failed
+  WHERE id = job;
+$$;
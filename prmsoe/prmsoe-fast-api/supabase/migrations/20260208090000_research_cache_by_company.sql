@@ -0,0 +1,12 @@
+-- Re-key the You.com cache by normalized company + ISO week (Monday) instead of query hash
+-- Cached rows are disposable, so the old table is dropped rather than migrated
+
+DROP TABLE IF EXISTS research_cache;
+
+CREATE TABLE research_cache (
+  company_norm text NOT NULL,
+  week_bucket date NOT NULL,
+  response jsonb NOT NULL,
+  created_at timestamptz DEFAULT now(),
+  PRIMARY KEY (company_norm, week_bucket)
+);
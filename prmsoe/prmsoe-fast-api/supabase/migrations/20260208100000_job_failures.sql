@@ -0,0 +1,12 @@
+-- Per-contact failure reasons for an enrichment job, batch-inserted by enrich_batch
+-- contact_id has no FK: a contact that vanished mid-job is itself a recorded failure
+
+CREATE TABLE IF NOT EXISTS job_failures (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  job_id uuid NOT NULL REFERENCES enrichment_jobs(id) ON DELETE CASCADE,
+  contact_id uuid NOT NULL,
+  reason text,
+  created_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_failures_job ON job_failures(job_id);
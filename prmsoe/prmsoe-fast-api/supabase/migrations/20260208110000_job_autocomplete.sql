@@ -0,0 +1,21 @@
+-- Mark an enrichment job COMPLETED as soon as its counters account for every contact,
+-- in the same UPDATE that bumps them (no trailing status write from the worker)
+
+CREATE OR REPLACE FUNCTION set_job_completed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.status := 'COMPLETED';
+  NEW.completed_at := now();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS enrichment_jobs_autocomplete ON enrichment_jobs;
+
+CREATE TRIGGER enrichment_jobs_autocomplete
+BEFORE UPDATE ON enrichment_jobs
+FOR EACH ROW
+WHEN (NEW.processed_count + NEW.failed_count >= NEW.total_contacts AND NEW.status = 'RUNNING')
+EXECUTE FUNCTION set_job_completed();
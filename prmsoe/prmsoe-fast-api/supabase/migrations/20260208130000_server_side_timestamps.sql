@@ -0,0 +1,13 @@
+-- Let Postgres stamp job/outreach times with now() instead of the API shipping isoformat strings
+
+-- Also auto-complete on INSERT, so an empty upload's job (total_contacts = 0) is born COMPLETED
+DROP TRIGGER IF EXISTS enrichment_jobs_autocomplete ON enrichment_jobs;
+
+CREATE TRIGGER enrichment_jobs_autocomplete
+BEFORE INSERT OR UPDATE ON enrichment_jobs
+FOR EACH ROW
+WHEN (NEW.processed_count + NEW.failed_count >= NEW.total_contacts AND NEW.status = 'RUNNING')
+EXECUTE FUNCTION set_job_completed();
+
+-- /action/send feedback window (sent_at already defaults to now())
+ALTER TABLE outreach_attempts ALTER COLUMN feedback_due_at SET DEFAULT now() + interval '3 days';
@@ -0,0 +1,66 @@
+-- Idempotent job writes: a replayed flush (or a resumed job) must never count a contact
+-- twice — over-counting lets the autocomplete trigger finish a job with contacts still RESEARCHING
+
+-- enrich_many: only rows whose research is actually inserted get drafted and counted
+
+CREATE OR REPLACE FUNCTION enrich_many(job uuid, rows jsonb)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  n integer;
+BEGIN
+  WITH inserted AS (
+    INSERT INTO research (contact_id, news_summary, pain_points, source_url, raw_response)
+    SELECT r.contact_id, r.news_summary, r.pain_points, r.source_url, r.raw_response
+    FROM jsonb_to_recordset(rows) AS r(
+      contact_id uuid, news_summary text, pain_points text, source_url text, raw_response jsonb
+    )
+    ON CONFLICT (contact_id) DO NOTHING
+    RETURNING contact_id
+  ), drafted AS (
+    UPDATE contacts c
+    SET draft_message = r.draft_message,
+        strategy_tag = r.strategy_tag,
+        status = 'DRAFT_READY'
+    FROM jsonb_to_recordset(rows) AS r(contact_id uuid, draft_message text, strategy_tag strategy_tag)
+    JOIN inserted i ON i.contact_id = r.contact_id
+    WHERE c.id = r.contact_id
+    RETURNING c.id
+  )
+  SELECT count(*) INTO n FROM drafted;
+
+  IF n > 0 THEN
+    UPDATE enrichment_jobs SET processed_count = processed_count + n WHERE id = job;
+  END IF;
+END;
+$$;
+
+-- record_failures: job_failures insert + failed_count bump in one transaction, counting
+-- only newly recorded failures (and never a contact whose research already landed)
+-- rows: [{contact_id, reason}, ...]
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_job_failures_job_contact ON job_failures(job_id, contact_id);
+
+CREATE OR REPLACE FUNCTION record_failures(job uuid, rows jsonb)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  n integer;
+BEGIN
+  WITH recorded AS (
+    INSERT INTO job_failures (job_id, contact_id, reason)
+    SELECT job, r.contact_id, r.reason
+    FROM jsonb_to_recordset(rows) AS r(contact_id uuid, reason text)
+    WHERE NOT EXISTS (SELECT 1 FROM research WHERE research.contact_id = r.contact_id)
+    ON CONFLICT (job_id, contact_id) DO NOTHING
+    RETURNING 1
+  )
+  SELECT count(*) INTO n FROM recorded;
+
+  IF n > 0 THEN
+    UPDATE enrichment_jobs SET failed_count = failed_count + n WHERE id = job;
+  END IF;
+END;
+$$;
@@ -0,0 +1,12 @@
+-- Terminal state for a job whose worker died before every contact was counted
+-- (the autocomplete trigger can then never fire); no-op once the job has finished
+
+CREATE OR REPLACE FUNCTION fail_job(job uuid)
+RETURNS void
+LANGUAGE sql
+AS $$
+  UPDATE enrichment_jobs
+  SET status = 'FAILED',
+      completed_at = now()
+  WHERE id = job AND status = 'RUNNING';
+$$;
@@ -0,0 +1,6 @@
+-- Drop job-counter RPCs superseded by enrich_many / record_failures (nothing calls them)
+
+DROP FUNCTION IF EXISTS increment_failed(uuid);
+DROP FUNCTION IF EXISTS increment_processed(uuid);
+DROP FUNCTION IF EXISTS enrich_one(uuid, uuid, text, text, text, jsonb, text, text);
+DROP FUNCTION IF EXISTS bump_job(uuid, int, int);
@@ -3,17 +3,30 @@ End-to-end test for all PRMSOE endpoints.
 
 Usage:
     1. Start server:  python app.py
-    2. Run tests:     python test_endpoints.py
+    2. Run tests:     python test_endpoints.py [--full]
+
+    --full lists a whole page of drafts instead of just the one used for the send step.
 
 Creates a test user in Supabase auth + profiles, then exercises the full flow:
-  upload CSV → poll status → get drafts → send → feedback queue → swipe → analytics
+  upload CSV → poll status → get drafts → send → feedback queue + analytics → swipe
+
+State from earlier runs is removed with REST DELETEs (cleanup_test_data) rather than
+a rolled-back DB transaction: the server and its enrichment worker write through
+PostgREST on their own connections, so a test-side transaction can't see or undo them.
 """
 
+import asyncio
+import atexit
+import io
+import itertools
+import json
 import os
 import sys
 import time
+from pathlib import Path
 
 import httpx
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -28,29 +41,81 @@ sb_headers = {
     "Content-Type": "application/json",
 }
 
+FULL = "--full" in sys.argv
+
 TEST_EMAIL = "testuser@prmsoe-test.local"
 TEST_PASSWORD = "testpass123456"
 
-client = httpx.Client(base_url=BASE, timeout=30)
+# Local cache of TEST_EMAIL → user_id so repeat runs skip the Auth admin API
+STATE_FILE = Path(__file__).with_name(".test_state.json")
+
+# Max ids per PostgREST `in.(...)` filter — keeps DELETE URLs well under proxy limits
+DELETE_BATCH_SIZE = 100
+
+# Cleanup ignores DELETE bodies — don't make PostgREST serialize the deleted rows
+DEL_HEADERS = {"Prefer": "return=minimal"}
+
+SEP = "=" * 60
+
+CSV_BYTES = Path(__file__).with_name("test.csv").read_bytes()
+
+client = httpx.Client(
+    base_url=BASE,
+    timeout=30,
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+)
+
+# Shared Supabase client so setup + cleanup reuse one keep-alive pool
+SB = httpx.Client(
+    base_url=SUPABASE_URL,
+    headers=sb_headers,
+    timeout=15,
+    limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=30),
+)
+atexit.register(SB.close)
 
 
 def log(label: str, data):
-    print(f"\n{'='*60}")
-    print(f"  {label}")
-    print(f"{'='*60}")
     if isinstance(data, dict):
-        for k, v in data.items():
-            print(f"  {k}: {v}")
+        body = "\n".join(f"  {k}: {v}" for k, v in data.items())
     else:
-        print(f"  {data}")
+        body = f"  {data}"
+    sys.stdout.write(f"\n{SEP}\n  {label}\n{SEP}\n{body}\n")
+
+
+def load_cached_user_id() -> str | None:
+    try:
+        return json.loads(STATE_FILE.read_text()).get(TEST_EMAIL)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_user_id(user_id: str):
+    try:
+        state = json.loads(STATE_FILE.read_text())
+    except (OSError, ValueError):
+        state = {}
+    state[TEST_EMAIL] = user_id
+    STATE_FILE.write_text(json.dumps(state))
 
 
 def setup_test_user() -> str:
     """Create (or retrieve) a test user in Supabase Auth + profiles table."""
-    sb = httpx.Client(base_url=SUPABASE_URL, headers=sb_headers, timeout=15)
+    # Reuse the user_id cached by a previous run if its profile still exists
+    cached_id = load_cached_user_id()
+    if cached_id:
+        resp = SB.head(
+            "/rest/v1/profiles",
+            params={"id": f"eq.{cached_id}", "select": "id"},
+            headers={"Prefer": "count=exact"},
+        )
+        if resp.headers.get("Content-Range", "*/0").split("/")[-1] != "0":
+            log("Reusing cached test user", {"user_id": cached_id})
+            return cached_id
 
     # Try to create user via Auth admin API
-    resp = sb.post("/auth/v1/admin/users", json={
+    resp = SB.post("/auth/v1/admin/users", json={
         "email": TEST_EMAIL,
         "password": TEST_PASSWORD,
         "email_confirm": True,
@@ -60,8 +125,8 @@ def setup_test_user() -> str:
         user_id = resp.json()["id"]
         log("Created test user", {"user_id": user_id, "email": TEST_EMAIL})
     elif resp.status_code == 422:
-        # User already exists — fetch by email
-        resp2 = sb.get("/auth/v1/admin/users")
+        # User already exists — fetch by email (server-side filter, not a full user listing)
+        resp2 = SB.get("/auth/v1/admin/users", params={"filter": TEST_EMAIL, "per_page": 10})
         users = resp2.json().get("users", [])
         user_id = next(u["id"] for u in users if u.get("email") == TEST_EMAIL)
         log("Found existing test user", {"user_id": user_id})
@@ -69,61 +134,70 @@ def setup_test_user() -> str:
         print(f"Failed to create user: {resp.status_code} {resp.text}")
         sys.exit(1)
 
-    # Ensure profiles row exists
-    resp = sb.get(
+    # Ensure profiles row exists — single upsert; an existing row is left untouched
+    resp = SB.post(
         "/rest/v1/profiles",
-        params={"id": f"eq.{user_id}", "select": "id"},
-        headers={**sb_headers, "Prefer": "return=representation"},
+        params={"on_conflict": "id"},
+        json={
+            "id": user_id,
+            "mission_statement": "I want to reduce food waste in urban areas",
+            "intent_type": "VALIDATION",
+        },
+        headers={"Prefer": "resolution=ignore-duplicates,return=representation"},
     )
-    if not resp.json():
-        sb.post(
-            "/rest/v1/profiles",
-            json={
-                "id": user_id,
-                "mission_statement": "I want to reduce food waste in urban areas",
-                "intent_type": "VALIDATION",
-            },
-            headers={**sb_headers, "Prefer": "return=representation"},
-        )
+    if resp.json():
         log("Created profile", {"mission": "I want to reduce food waste in urban areas"})
 
-    sb.close()
+    save_cached_user_id(user_id)
     return user_id
 
 
-def cleanup_test_data(user_id: str):
+async def cleanup_test_data(user_id: str):
     """Remove test data from previous runs (contacts, research, jobs, outreach)."""
-    sb = httpx.Client(base_url=SUPABASE_URL, headers=sb_headers, timeout=15)
-
-    # Get contact IDs for this user
-    resp = sb.get("/rest/v1/contacts", params={"user_id": f"eq.{user_id}", "select": "id"})
-    contact_ids = [c["id"] for c in resp.json()]
-
-    if contact_ids:
-        # Delete outreach_attempts for these contacts
-        for cid in contact_ids:
-            sb.delete("/rest/v1/outreach_attempts", params={"contact_id": f"eq.{cid}"})
-        # Delete research for these contacts
-        for cid in contact_ids:
-            sb.delete("/rest/v1/research", params={"contact_id": f"eq.{cid}"})
-        # Delete contacts
-        sb.delete("/rest/v1/contacts", params={"user_id": f"eq.{user_id}"})
-
-    # Delete enrichment jobs
-    sb.delete("/rest/v1/enrichment_jobs", params={"user_id": f"eq.{user_id}"})
-
-    sb.close()
+    async with httpx.AsyncClient(base_url=SUPABASE_URL, headers=sb_headers, timeout=15) as sb:
+        # Count-only HEAD first — a fresh env skips fetching + parsing the id list
+        resp = await sb.head(
+            "/rest/v1/contacts",
+            params={"user_id": f"eq.{user_id}", "select": "id"},
+            headers={"Prefer": "count=exact", "Range-Unit": "items", "Range": "0-0"},
+        )
+        total = int(resp.headers.get("Content-Range", "*/0").split("/")[-1])
+
+        contact_ids: list[str] = []
+        if total:
+            resp = await sb.get("/rest/v1/contacts", params={"user_id": f"eq.{user_id}", "select": "id"})
+            contact_ids = [c["id"] for c in resp.json()]
+
+        async def delete_contacts():
+            # outreach_attempts + research reference contacts, so they go first
+            await asyncio.gather(*(
+                sb.delete(
+                    f"/rest/v1/{table}",
+                    params={"contact_id": f"in.({','.join(batch)})"},
+                    headers=DEL_HEADERS,
+                )
+                for batch in itertools.batched(contact_ids, DELETE_BATCH_SIZE)
+                for table in ("outreach_attempts", "research")
+            ))
+            await sb.delete("/rest/v1/contacts", params={"user_id": f"eq.{user_id}"}, headers=DEL_HEADERS)
+
+        # enrichment_jobs has no FK on contacts — delete it alongside the contact chain
+        tasks = [sb.delete("/rest/v1/enrichment_jobs", params={"user_id": f"eq.{user_id}"}, headers=DEL_HEADERS)]
+        if contact_ids:
+            tasks.append(delete_contacts())
+        await asyncio.gather(*tasks)
+
     log("Cleanup", f"Removed {len(contact_ids)} contacts + related data")
 
 
 def test_upload(user_id: str) -> dict:
     """POST /ingest/upload"""
-    with open("test.csv", "rb") as f:
-        resp = client.post(
-            "/ingest/upload",
-            data={"user_id": user_id},
-            files={"file": ("test.csv", f, "text/csv")},
-        )
+    # Fresh handle over the preloaded bytes — no disk I/O per upload
+    resp = client.post(
+        "/ingest/upload",
+        data={"user_id": user_id},
+        files={"file": ("test.csv", io.BytesIO(CSV_BYTES), "text/csv")},
+    )
     assert resp.status_code == 200, f"Upload failed: {resp.status_code} {resp.text}"
     data = resp.json()
     log("POST /ingest/upload", data)
@@ -135,10 +209,14 @@ def test_upload(user_id: str) -> dict:
 def test_status(job_id: str, user_id: str) -> dict:
     """GET /ingest/status/{job_id} — poll until complete."""
     log("Polling GET /ingest/status", f"job_id={job_id}")
-    for i in range(60):  # max 2 minutes
+    # Exponential backoff: short jobs are seen quickly, long jobs aren't hammered
+    delay, max_delay = 0.25, 4.0
+    deadline = time.monotonic() + 120  # max 2 minutes
+    i = 0
+    while time.monotonic() < deadline:
         resp = client.get(f"/ingest/status/{job_id}", params={"user_id": user_id})
         assert resp.status_code == 200, f"Status failed: {resp.status_code} {resp.text}"
-        data = resp.json()
+        data = orjson.loads(resp.content)
         status = data["status"]
         processed = data["processed_count"]
         total = data["total_contacts"]
@@ -147,13 +225,15 @@ def test_status(job_id: str, user_id: str) -> dict:
         if status in ("COMPLETED", "FAILED"):
             log("Job finished", data)
             return data
-        time.sleep(2)
+        time.sleep(delay)
+        delay = min(delay * 1.7, max_delay)
+        i += 1
     raise TimeoutError("Job did not complete in 2 minutes")
 
 
-def test_drafts(user_id: str) -> list:
-    """GET /feed/drafts"""
-    resp = client.get("/feed/drafts", params={"user_id": user_id, "limit": 20, "offset": 0})
+def test_drafts(user_id: str, limit: int = 1) -> list:
+    """GET /feed/drafts — the send step only needs one; pass --full to list a page of 20."""
+    resp = client.get("/feed/drafts", params={"user_id": user_id, "limit": limit, "offset": 0})
     assert resp.status_code == 200, f"Drafts failed: {resp.status_code} {resp.text}"
     data = resp.json()
     log("GET /feed/drafts", {
@@ -161,11 +241,15 @@ def test_drafts(user_id: str) -> list:
         "has_more": data["has_more"],
         "drafts_returned": len(data["drafts"]),
     })
-    for d in data["drafts"]:
-        print(f"  - {d['full_name']} @ {d['company_name']}")
-        print(f"    strategy: {d['strategy_tag']}")
-        print(f"    draft: {d['draft_message'][:100]}...")
-        print(f"    research: {d['research']['news_summary'][:80]}...")
+    lines = [
+        f"  - {d['full_name']} @ {d['company_name']}\n"
+        f"    strategy: {d['strategy_tag']}\n"
+        f"    draft: {d['draft_message'][:100]}...\n"
+        f"    research: {d['research']['news_summary'][:80]}..."
+        for d in data["drafts"]
+    ]
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
     return data["drafts"]
 
 
@@ -184,9 +268,9 @@ def test_send(draft: dict) -> dict:
     return data
 
 
-def test_feedback_queue(user_id: str) -> list:
+async def atest_feedback_queue(aclient: httpx.AsyncClient, user_id: str) -> list:
     """GET /feedback/queue"""
-    resp = client.get("/feedback/queue", params={"user_id": user_id})
+    resp = await aclient.get("/feedback/queue", params={"user_id": user_id})
     assert resp.status_code == 200, f"Queue failed: {resp.status_code} {resp.text}"
     data = resp.json()
     log("GET /feedback/queue", {"pending_count": len(data["pending"])})
@@ -207,55 +291,62 @@ def test_swipe(outreach_id: str):
     assert data["ok"] is True
 
 
-def test_analytics(user_id: str):
+async def atest_analytics(aclient: httpx.AsyncClient, user_id: str):
     """GET /analytics/dashboard"""
-    resp = client.get("/analytics/dashboard", params={"user_id": user_id})
+    resp = await aclient.get("/analytics/dashboard", params={"user_id": user_id})
     assert resp.status_code == 200, f"Analytics failed: {resp.status_code} {resp.text}"
     data = resp.json()
     log("GET /analytics/dashboard", data)
     return data
 
 
-def main():
-    print("PRMSOE End-to-End Test")
-    print(f"Target: {BASE}\n")
-
-    # Setup
-    user_id = setup_test_user()
-    cleanup_test_data(user_id)
-
-    # 1. Upload CSV
-    upload = test_upload(user_id)
-
-    # 2. Poll enrichment status
-    test_status(upload["job_id"], user_id)
-
-    # 3. Get drafts
-    drafts = test_drafts(user_id)
-    if not drafts:
-        print("\nNo drafts found — enrichment may have failed. Check server logs.")
-        sys.exit(1)
-
-    # 4. Send first draft
-    send_result = test_send(drafts[0])
-
-    # 5. Check feedback queue
-    # Note: feedback_due_at is now()+3 days, so the queue will be empty unless
-    # we manually set it. Let's test the endpoint returns successfully anyway.
-    queue = test_feedback_queue(user_id)
-    if not queue:
-        print("  (queue empty — expected, feedback_due_at is 3 days from now)")
-        # Use the outreach_id from send directly for swipe test
-        test_swipe(send_result["outreach_id"])
-    else:
-        test_swipe(queue[0]["outreach_id"])
+async def probe_queue_and_analytics(user_id: str) -> tuple[list, dict]:
+    """Fetch feedback queue + analytics concurrently — neither depends on the other."""
+    async with httpx.AsyncClient(base_url=BASE, timeout=30) as aclient:
+        return await asyncio.gather(
+            atest_feedback_queue(aclient, user_id),
+            atest_analytics(aclient, user_id),
+        )
 
-    # 6. Analytics
-    test_analytics(user_id)
 
-    print(f"\n{'='*60}")
-    print("  ALL TESTS PASSED")
-    print(f"{'='*60}")
+def main():
+    with client:
+        print("PRMSOE End-to-End Test")
+        print(f"Target: {BASE}\n")
+
+        # Setup
+        user_id = setup_test_user()
+        asyncio.run(cleanup_test_data(user_id))
+
+        # 1. Upload CSV
+        upload = test_upload(user_id)
+
+        # 2. Poll enrichment status
+        test_status(upload["job_id"], user_id)
+
+        # 3. Get drafts
+        drafts = test_drafts(user_id, limit=20 if FULL else 1)
+        if not drafts:
+            print("\nNo drafts found — enrichment may have failed. Check server logs.")
+            sys.exit(1)
+
+        # 4. Send first draft
+        send_result = test_send(drafts[0])
+
+        # 5. Check feedback queue + 6. analytics (independent, fetched concurrently)
+        # Note: feedback_due_at is now()+3 days, so the queue will be empty unless
+        # we manually set it. Let's test the endpoint returns successfully anyway.
+        queue, _ = asyncio.run(probe_queue_and_analytics(user_id))
+
+        # 7. Swipe (depends on queue output)
+        if not queue:
+            print("  (queue empty — expected, feedback_due_at is 3 days from now)")
+            # Use the outreach_id from send directly for swipe test
+            test_swipe(send_result["outreach_id"])
+        else:
+            test_swipe(queue[0]["outreach_id"])
+
+        sys.stdout.write(f"\n{SEP}\n  ALL TESTS PASSED\n{SEP}\n")
 
 
 if __name__ == "__main__":
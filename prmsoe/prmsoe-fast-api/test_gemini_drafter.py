@@ -0,0 +1,169 @@
+"""
+Offline checks for the Gemini draft micro-batcher (app.gemini_drafter / _generate_drafts_json).
+
+Usage:
+    python test_gemini_drafter.py      (or: pytest test_gemini_drafter.py)
+
+No network or credentials: the Gemini calls are replaced with in-process fakes.
+"""
+
+import asyncio
+import contextlib
+import json
+from types import SimpleNamespace
+
+from aiolimiter import AsyncLimiter
+
+import app
+
+
+@contextlib.contextmanager
+def patched(**attrs):
+    """Temporarily replace module-level names in app (restored on exit)."""
+    saved = {name: getattr(app, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(app, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(app, name, value)
+
+
+def fakes(batch_error: Exception | None = None, single_error_for: str | None = None):
+    """Fake _generate_drafts_json / _generate_draft_json that record every call."""
+    calls = {"batch": [], "single": []}
+
+    async def fake_batch(client, limiter, prompts):
+        calls["batch"].append(list(prompts))
+        if batch_error:
+            raise batch_error
+        return [{"draft_message": p, "strategy_tag": "DIRECT_PITCH"} for p in prompts]
+
+    async def fake_single(client, limiter, prompt):
+        calls["single"].append(prompt)
+        if prompt == single_error_for:
+            raise RuntimeError("boom")
+        return {"draft_message": prompt, "strategy_tag": "DIRECT_PITCH"}
+
+    return calls, {
+        "_generate_drafts_json": fake_batch,
+        "_generate_draft_json": fake_single,
+        "gemini_client": lambda: object(),
+    }
+
+
+def fake_gemini(payload: list) -> SimpleNamespace:
+    """Stand-in for genai.Client whose generate_content returns `payload` as JSON text."""
+
+    async def generate_content(**kwargs):
+        return SimpleNamespace(text=json.dumps(payload))
+
+    return SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+
+
+def test_flush_on_size():
+    calls, fns = fakes()
+    prompts = [f"p{i}" for i in range(app.DRAFT_BATCH_SIZE)]
+
+    async def main():
+        draft = app.gemini_drafter(AsyncLimiter(100, 1))
+        # Window far longer than the timeout: only a full batch can dispatch in time
+        return await asyncio.wait_for(asyncio.gather(*(draft(p) for p in prompts)), timeout=5)
+
+    with patched(DRAFT_BATCH_WINDOW_SEC=60, **fns):
+        results = asyncio.run(main())
+
+    assert calls["batch"] == [prompts]
+    assert calls["single"] == []
+    assert [r["draft_message"] for r in results] == prompts
+
+
+def test_flush_on_window():
+    calls, fns = fakes()
+
+    async def main():
+        draft = app.gemini_drafter(AsyncLimiter(100, 1))
+        return await asyncio.wait_for(asyncio.gather(draft("a"), draft("b"), draft("c")), timeout=5)
+
+    with patched(DRAFT_BATCH_WINDOW_SEC=0.01, **fns):
+        results = asyncio.run(main())
+
+    assert calls["batch"] == [["a", "b", "c"]]
+    assert [r["draft_message"] for r in results] == ["a", "b", "c"]
+
+
+def test_single_prompt_skips_batch_call():
+    calls, fns = fakes()
+
+    async def main():
+        draft = app.gemini_drafter(AsyncLimiter(100, 1))
+        return await asyncio.wait_for(draft("solo"), timeout=5)
+
+    with patched(DRAFT_BATCH_WINDOW_SEC=0.01, **fns):
+        result = asyncio.run(main())
+
+    assert calls == {"batch": [], "single": ["solo"]}
+    assert result["draft_message"] == "solo"
+
+
+def test_unusable_batch_falls_back_per_prompt():
+    calls, fns = fakes(batch_error=ValueError("batched drafts don't map one-to-one onto tasks"), single_error_for="b")
+
+    async def main():
+        draft = app.gemini_drafter(AsyncLimiter(100, 1))
+        return await asyncio.wait_for(
+            asyncio.gather(draft("a"), draft("b"), draft("c"), return_exceptions=True), timeout=5
+        )
+
+    with patched(DRAFT_BATCH_WINDOW_SEC=0.01, **fns):
+        a, b, c = asyncio.run(main())
+
+    assert calls["single"] == ["a", "b", "c"]
+    assert a["draft_message"] == "a" and c["draft_message"] == "c"
+    assert isinstance(b, RuntimeError)  # one prompt's failure stays with that prompt
+
+
+def test_persistent_api_error_does_not_fan_out():
+    calls, fns = fakes(batch_error=RuntimeError("429 after retries"))
+
+    async def main():
+        draft = app.gemini_drafter(AsyncLimiter(100, 1))
+        return await asyncio.wait_for(
+            asyncio.gather(draft("a"), draft("b"), return_exceptions=True), timeout=5
+        )
+
+    with patched(DRAFT_BATCH_WINDOW_SEC=0.01, **fns):
+        results = asyncio.run(main())
+
+    assert calls["single"] == []
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_batched_drafts_matched_by_task_not_position():
+    reordered = [
+        {"task": 2, "draft_message": "Hi B", "strategy_tag": "PAIN_POINT"},
+        {"task": 1, "draft_message": "Hi A", "strategy_tag": "DIRECT_PITCH"},
+    ]
+    results = asyncio.run(app._generate_drafts_json(fake_gemini(reordered), AsyncLimiter(100, 1), ["A", "B"]))
+    assert [r["draft_message"] for r in results] == ["Hi A", "Hi B"]
+
+
+def test_batched_drafts_with_mismatched_tasks_rejected():
+    duplicated = [
+        {"task": 1, "draft_message": "Hi A", "strategy_tag": "DIRECT_PITCH"},
+        {"task": 1, "draft_message": "Hi A again", "strategy_tag": "DIRECT_PITCH"},
+    ]
+    try:
+        asyncio.run(app._generate_drafts_json(fake_gemini(duplicated), AsyncLimiter(100, 1), ["A", "B"]))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("mismatched tasks were accepted")
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"  ok  {name}")